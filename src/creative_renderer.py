@@ -21,6 +21,11 @@ except:
 
 DEFAULT_CIPHER_KEY = "dqkwfjkefq;"
 
+# Patterns used by replace_kd_in_adcode
+_MN_KD_RE = re.compile(r'mn_kd\s*=\s*"[^"]*"')
+_MN_CSRSV2_SCRIPT_END_RE = re.compile(r'(mn_csrsv2\s*=\s*"[^"]+";)(</script>)')
+_SCRIPT_END_RE = re.compile(r'(;)(</script>)', re.IGNORECASE)
+
 
 def unescape_adcode(adcode):
     """
@@ -210,7 +215,6 @@ def load_prerendered_responses(file_id):
     """
     from src.data_loader import load_csv_from_gdrive
     import streamlit as st
-    import re
     
     if not file_id or file_id.strip() == "":
         return None
@@ -431,19 +435,15 @@ def replace_kd_in_adcode(adcode, url_encoded_kd):
     # Check if mn_kd already exists
     if 'mn_kd=' in adcode or 'mn_kd =' in adcode:
         # Replace existing mn_kd value
-        adcode = re.sub(
-            r'mn_kd\s*=\s*"[^"]*"',
-            f'mn_kd="{url_encoded_kd}"',
-            adcode
-        )
+        adcode = _MN_KD_RE.sub(f'mn_kd="{url_encoded_kd}"', adcode)
     else:
         # Add mn_kd before the closing </script> of the first script tag
-        match = re.search(r'(mn_csrsv2\s*=\s*"[^"]+";)(</script>)', adcode)
+        match = _MN_CSRSV2_SCRIPT_END_RE.search(adcode)
         if match:
             adcode = adcode[:match.end(1)] + f'mn_kd="{url_encoded_kd}";' + adcode[match.end(1):]
         else:
             # Fallback: try to find any </script> tag
-            match = re.search(r'(;)(</script>)', adcode, re.IGNORECASE)
+            match = _SCRIPT_END_RE.search(adcode)
             if match:
                 adcode = adcode[:match.end(1)] + f'mn_kd="{url_encoded_kd}";' + adcode[match.end(1):]
 
@@ -453,7 +453,6 @@ def replace_kd_in_adcode(adcode, url_encoded_kd):
 def get_prerendered_creative(creative_id, creative_size, prerendered_df):
     """Get pre-rendered creative from File D - parses Request JSON to extract creative info"""
     import streamlit as st
-    import json
     
     if prerendered_df is None or len(prerendered_df) == 0:
         return None
@@ -121,8 +121,6 @@ def clean_and_prepare_html(page_html, base_url):
 
 def render_html_with_proper_encoding(page_html, device, unique_id_prefix, url, flow, scrolling=False):
     """Render HTML with proper encoding using standard renderer"""
-    from src.renderers import render_mini_device_preview, inject_unique_id
-    
     # Determine orientation based on DEVICE TYPE, not layout
     # Laptop = always landscape (wide), Mobile/Tablet = portrait (tall)
     if device == 'laptop':
@@ -5,7 +5,6 @@ Uses EasyOCR which doesn't require system dependencies
 """
 
 import streamlit as st
-from PIL import Image
 import requests
 from io import BytesIO
 
@@ -50,7 +49,8 @@ def extract_text_from_screenshot_url(screenshot_url):
         if response.status_code != 200:
             return ""
         
-        # Convert to PIL Image
+        # Convert to PIL Image (Pillow is only loaded once OCR actually runs)
+        from PIL import Image
         image = Image.open(BytesIO(response.content))
         
         # Run OCR
@@ -6,43 +6,160 @@ Kept: Core functionality, 403 handling, Screenshot API fallback
 """
 
 import streamlit as st
-import requests
-import pandas as pd
+import asyncio
+import hashlib
+import queue
 import re
 import random
-from urllib.parse import quote, unquote, urlparse
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import quote, urlparse, urlencode, parse_qsl
 
 try:
     from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+    from playwright.async_api import async_playwright
     PLAYWRIGHT_AVAILABLE = True
 except:
     PLAYWRIGHT_AVAILABLE = False
 
+# Playwright's sync API is tied to the thread that started it, and Streamlit runs each rerun
+# on a new thread, so browser calls go through a small pool of worker threads. Each worker
+# owns its own driver and Chromium instance (in _worker_state) and each capture only opens a
+# new context. A browser costs a few hundred MB, so a worker closes its own after
+# _PLAYWRIGHT_IDLE_TIMEOUT without captures and relaunches it on the next one.
+_PLAYWRIGHT_WORKERS = 3
+_PLAYWRIGHT_IDLE_TIMEOUT = 300  # 5 minutes
+_capture_queue = queue.Queue()
+_capture_workers = []
+_capture_workers_lock = threading.Lock()
+_worker_state = threading.local()
+
+# Device viewports (Playwright contexts and Screenshot API)
+_VIEWPORTS = {
+    'mobile': {'width': 390, 'height': 844},
+    'tablet': {'width': 1024, 'height': 768},
+    'laptop': {'width': 1920, 'height': 1080}
+}
+
+# One is picked at random per capture
+_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+)
+
+# Headless capture needs none of the GPU, extension, sync or first-run machinery; turning it
+# off shortens the cold start and trims the browser's memory in small containers
+_CHROMIUM_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-sync',
+    '--disable-default-apps',
+    '--disable-background-networking',
+    '--disable-features=Translate',
+    '--no-first-run',
+]
+
+# Navigation waits for domcontentloaded only, so this bounds slow servers rather than slow pages
+_NAV_TIMEOUT_MS = 15000
+
+# Light captures only need the DOM, so these are never downloaded
+_BLOCKED_RESOURCE_TYPES = frozenset({'image', 'media', 'font', 'stylesheet'})
+_BLOCKED_HOSTS = (
+    'doubleclick.net',
+    'googlesyndication.com',
+    'google-analytics.com',
+    'googletagmanager.com',
+)
+
+# Captured HTML is kept on disk across restarts; entries older than the TTL are refetched but
+# still served when a new capture fails, for up to the grace period. Expired rows are pruned on
+# write, and the newest rows are kept up to _CAPTURE_CACHE_MAX_BYTES of HTML in total.
+_CAPTURE_CACHE_PATH = '.screenshot_cache.db'
+_CAPTURE_CACHE_TTL = 24 * 3600  # 24 hours
+_CAPTURE_CACHE_STALE_GRACE = 7 * 24 * 3600  # 7 days
+_CAPTURE_CACHE_MAX_BYTES = 100 * 1024 * 1024  # 100 MB
+_capture_cache_conn = None
+_capture_cache_lock = threading.Lock()
+
+# cache key -> Future of the capture currently running for it
+_inflight_captures = {}
+_inflight_lock = threading.Lock()
+
+# hostname -> time until which captures are skipped, for hosts that answered 403 (e.g. bot
+# protection). Written by the Playwright workers under _blocked_hosts_lock.
+_blocked_hosts = {}
+_blocked_hosts_lock = threading.Lock()
+_BLOCKED_HOST_TTL = 3600  # 1 hour
+_BLOCKED_HOST_MAX = 512
+
+# Query parameters that never change the page served
+_TRACKING_PARAMS = ('utm_', 'gclid', 'fbclid', 'msclkid')
+
+# Returned by _capture_page when the caller should fall back to the Screenshot API
+_USE_SCREENSHOT_API = object()
+# Returned by _capture_page after a 403 on the original URL: retry once with the cleaned URL
+_RETRY_CLEANED_URL = object()
+
+# Essential stealth JS (only what works), injected into every capture page
+_STEALTH_INIT_SCRIPT = """
+    // Hide webdriver property
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    
+    // Add chrome object
+    if (!window.chrome) {
+        window.chrome = { runtime: {}, loadTimes: function() {}, csi: function() {} };
+    }
+    
+    // Mock permissions
+    const originalQuery = window.navigator.permissions.query;
+    window.navigator.permissions.query = (params) => (
+        params.name === 'notifications' ?
+            Promise.resolve({ state: Notification.permission }) :
+            originalQuery(params)
+    );
+"""
+
+
+_MACRO_RE = re.compile(r'\{[^}]+\}')
+
 
 def clean_url_for_capture(url):
     """Clean URL: remove protocol, www, query params. Keep only domain + path"""
-    if not url or pd.isna(url):
+    # url != url is only true for NaN (empty DataFrame cell)
+    if not url or (isinstance(url, float) and url != url):
         return None
     
     url = str(url).strip()
-    url = re.sub(r'^https?://', '', url)  # Remove protocol
-    url = re.sub(r'^www\.', '', url)  # Remove www
     
-    # Keep trailing slash if present
-    if '?' in url:
-        path_before_query = url.split('?')[0]
-        url = path_before_query
+    # Remove protocol and www with plain prefix checks, then cut everything from the query on
+    # (keeps trailing slash if present)
+    start = 8 if url.startswith('https://') else 7 if url.startswith('http://') else 0
+    if url.startswith('www.', start):
+        start += 4
+    end = url.find('?', start)
+    url = url[start:end] if end >= 0 else url[start:]
     
-    url = re.sub(r'\{[^}]+\}', '', url)  # Remove {macros}
+    # Remove {macros} - most URLs have none, so skip the regex unless there is a brace
+    if '{' in url:
+        url = _MACRO_RE.sub('', url)
     
     return url
 
 
 @st.cache_data(ttl=604800, show_spinner=False)
-def get_screenshot_url(url, device='mobile', full_page=False, try_cleaned=False):
+def get_screenshot_url(url, device='mobile', full_page=False, try_cleaned=False, thumbnail=False):
     """
     Generate ScreenshotOne API URL (cached for 7 days)
     Simple and reliable - works when Playwright fails
+    
+    thumbnail=True asks for a half-width JPEG of the same layout, for small previews
+    (about a quarter of the pixels and a much smaller download than the full PNG)
     """
     try:
         # Get API key
@@ -51,7 +168,7 @@ def get_screenshot_url(url, device='mobile', full_page=False, try_cleaned=False)
         except:
             return None
         
-        if not SCREENSHOT_API_KEY or not url or pd.isna(url):
+        if not SCREENSHOT_API_KEY or not url or (isinstance(url, float) and url != url):
             return None
         
         url = str(url).strip()
@@ -66,13 +183,7 @@ def get_screenshot_url(url, device='mobile', full_page=False, try_cleaned=False)
         if not url.startswith(('http://', 'https://')):
             url = f"https://{url}"
         
-        # Device viewports
-        viewports = {
-            'mobile': {'width': 390, 'height': 844},
-            'tablet': {'width': 1024, 'height': 768},
-            'laptop': {'width': 1920, 'height': 1080}
-        }
-        viewport = viewports.get(device, viewports['mobile'])
+        viewport = _VIEWPORTS.get(device, _VIEWPORTS['mobile'])
         
         # Build API URL
         params = {
@@ -89,6 +200,11 @@ def get_screenshot_url(url, device='mobile', full_page=False, try_cleaned=False)
             'full_page': 'true' if full_page else 'false',
             'delay': 1
         }
+        if thumbnail:
+            # Page still lays out at the device viewport; only the returned image is scaled down
+            params['image_width'] = viewport['width'] // 2
+            params['format'] = 'jpg'
+            params['image_quality'] = 75
         
         query_string = '&'.join([f"{k}={quote(str(v))}" for k, v in params.items()])
         return f"https://api.screenshotone.com/take?{query_string}"
@@ -108,7 +224,7 @@ def _handle_403_fallback(url, device):
     return None
 
 
-def capture_with_playwright(url, device='mobile', retry_count=1, use_firefox=False, try_cleaned_url=False):
+def capture_with_playwright(url, device='mobile', retry_count=1, use_firefox=False, try_cleaned_url=False, light=False):
     """
     Capture page with Playwright (SIMPLIFIED)
     
@@ -122,79 +238,273 @@ def capture_with_playwright(url, device='mobile', retry_count=1, use_firefox=Fal
     - Core stealth techniques that work
     - 403 detection and fallback
     - Screenshot API integration
+    
+    Pages are loaded in a fresh context on a long-lived Chromium instance per worker thread,
+    so only a worker's first capture pays for the browser launch. Pass light=True when only the
+    DOM is needed: images, media, fonts, stylesheets and ad/analytics requests are then not downloaded.
+    Captured HTML is cached on disk for 24 hours and served stale if a later capture fails.
     """
     if not PLAYWRIGHT_AVAILABLE:
         return None
     
+    cache_key = _capture_cache_key(url, device, try_cleaned_url, light)
+    cached_html, fresh = _capture_cache_get(cache_key)
+    if fresh:
+        return cached_html
+    
+    # Host refused the last capture with 403 - don't spend a navigation plus retry on it again
+    if _is_blocked_host(url):
+        return cached_html or _handle_403_fallback(url, device)
+    
+    # Single flight: concurrent requests for the same page share one capture
+    with _inflight_lock:
+        future = _inflight_captures.get(cache_key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight_captures[cache_key] = future
+    
+    if owner:
+        result = None
+        try:
+            result = _run_capture(url, device, try_cleaned_url, light)
+        except Exception:
+            pass
+        finally:
+            # Resolved even if this run is interrupted, so waiters never hang on it
+            with _inflight_lock:
+                _inflight_captures.pop(cache_key, None)
+            future.set_result(result)
+    else:
+        result = future.result()
+    
+    if isinstance(result, str):
+        if owner:
+            _capture_cache_put(cache_key, result)
+        return result
+    # Capture failed - a stale copy of the page beats a screenshot or nothing
+    if cached_html:
+        return cached_html
+    if result is _USE_SCREENSHOT_API:
+        return _handle_403_fallback(url, device)
+    return None
+
+
+def _run_capture(url, device, try_cleaned_url, light):
+    """Capture on a Playwright worker; after a 403, back off and retry the cleaned URL once"""
+    result = _submit_capture(url, device, try_cleaned_url, light).result()
+    if result is _RETRY_CLEANED_URL:
+        # Back off in the calling thread, so the worker keeps serving other sessions meanwhile
+        time.sleep(random.uniform(1, 2))
+        result = _submit_capture(url, device, True, light).result()
+    return result
+
+
+def _blocked_host_key(url):
+    # The 403 is usually seen on the cleaned URL, which has lost its www. prefix
+    host = urlparse(str(url).strip()).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def _is_blocked_host(url):
+    host = _blocked_host_key(url)
+    return bool(host) and _blocked_hosts.get(host, 0) > time.time()
+
+
+def _mark_blocked_host(url):
+    """Remember a 403 from url's host for _BLOCKED_HOST_TTL (called from the Playwright workers)"""
+    host = _blocked_host_key(url)
+    if not host:
+        return
+    with _blocked_hosts_lock:
+        _blocked_hosts.pop(host, None)
+        # Dict keeps insertion order, so the first key is the least recently blocked host
+        while len(_blocked_hosts) >= _BLOCKED_HOST_MAX:
+            _blocked_hosts.pop(next(iter(_blocked_hosts)), None)
+        _blocked_hosts[host] = time.time() + _BLOCKED_HOST_TTL
+
+
+def _normalize_url(url):
+    """Lowercase scheme/host and drop the fragment and tracking parameters, for cache keys"""
+    parsed = urlparse(str(url).strip())
+    query = urlencode([
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    ])
+    return parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), query=query, fragment='').geturl()
+
+
+def _capture_cache_key(url, device, try_cleaned_url, light):
+    key = f"{_normalize_url(url)}|{device}|{int(bool(try_cleaned_url))}|{int(bool(light))}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _capture_cache():
+    """Open the on-disk capture cache on first use (caller holds _capture_cache_lock)"""
+    global _capture_cache_conn
+    if _capture_cache_conn is None:
+        conn = sqlite3.connect(_CAPTURE_CACHE_PATH, check_same_thread=False)
+        conn.execute("CREATE TABLE IF NOT EXISTS captures (key TEXT PRIMARY KEY, body TEXT, stale_at REAL, size INTEGER)")
+        conn.execute("CREATE INDEX IF NOT EXISTS captures_stale_at ON captures (stale_at)")
+        _capture_cache_conn = conn
+    return _capture_cache_conn
+
+
+def _capture_cache_get(key):
+    """Returns (html, fresh); (None, False) on a miss or if the cache is unavailable"""
+    try:
+        with _capture_cache_lock:
+            row = _capture_cache().execute("SELECT body, stale_at FROM captures WHERE key = ?", (key,)).fetchone()
+    except sqlite3.Error:
+        return None, False
+    now = time.time()
+    if not row or row[1] < now - _CAPTURE_CACHE_STALE_GRACE:
+        return None, False
+    return row[0], row[1] > now
+
+
+def _capture_cache_put(key, html_content):
+    """Store a capture, then drop rows past the grace period and trim to the byte budget"""
+    now = time.time()
+    try:
+        with _capture_cache_lock:
+            conn = _capture_cache()
+            conn.execute(
+                "INSERT OR REPLACE INTO captures (key, body, stale_at, size) VALUES (?, ?, ?, ?)",
+                (key, html_content, now + _CAPTURE_CACHE_TTL, len(html_content.encode('utf-8'))),
+            )
+            conn.execute("DELETE FROM captures WHERE stale_at < ?", (now - _CAPTURE_CACHE_STALE_GRACE,))
+            # Keep the newest rows that fit in the budget
+            total = 0
+            evicted = []
+            for row_key, size in conn.execute("SELECT key, size FROM captures ORDER BY stale_at DESC"):
+                total += size
+                if total > _CAPTURE_CACHE_MAX_BYTES:
+                    evicted.append((row_key,))
+            conn.executemany("DELETE FROM captures WHERE key = ?", evicted)
+            conn.commit()
+    except sqlite3.Error:
+        pass
+
+
+def _submit_capture(url, device, try_cleaned_url, light):
+    """Queue a _capture_page call for the Playwright workers (started on first use); returns its Future"""
+    with _capture_workers_lock:
+        if not _capture_workers:
+            for i in range(_PLAYWRIGHT_WORKERS):
+                worker = threading.Thread(target=_playwright_worker, name=f'playwright-{i}', daemon=True)
+                worker.start()
+                _capture_workers.append(worker)
+    future = Future()
+    _capture_queue.put((future, (url, device, try_cleaned_url, light)))
+    return future
+
+
+def _playwright_worker():
+    """Run queued captures on this thread's browser; close the browser once idle"""
+    while True:
+        try:
+            future, args = _capture_queue.get(timeout=_PLAYWRIGHT_IDLE_TIMEOUT)
+        except queue.Empty:
+            _stop_worker_playwright()
+            continue
+        try:
+            future.set_result(_capture_page(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+
+def _get_browser():
+    """Chromium instance of the current Playwright worker thread, launched on first use"""
+    browser = getattr(_worker_state, 'browser', None)
+    if browser is not None and browser.is_connected():
+        return browser
+    
+    # Browser is gone (or never started) and its driver may have died with it - start both afresh
+    _stop_worker_playwright()
+    _worker_state.playwright = sync_playwright().start()
+    # Use Chromium only (Firefox doesn't help)
+    _worker_state.browser = _worker_state.playwright.chromium.launch(headless=True, args=_CHROMIUM_ARGS)
+    return _worker_state.browser
+
+
+def _stop_worker_playwright():
+    """Stop the current worker's driver, ignoring errors from one that already died"""
+    playwright = getattr(_worker_state, 'playwright', None)
+    _worker_state.playwright = None
+    _worker_state.browser = None
+    if playwright is not None:
+        try:
+            playwright.stop()
+        except Exception:
+            pass
+
+
+def _is_blocked_request(request):
+    """True for requests a light capture skips: non-HTML assets and ad/analytics hosts"""
+    if request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(request.url).hostname or ''
+    return any(host == blocked or host.endswith('.' + blocked) for blocked in _BLOCKED_HOSTS)
+
+
+def _route_light(route):
+    if _is_blocked_request(route.request):
+        route.abort()
+    else:
+        route.continue_()
+
+
+async def _route_light_async(route):
+    if _is_blocked_request(route.request):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+def _context_options(device):
+    """Browser context settings for a capture: device viewport, random user agent, realistic headers"""
+    return {
+        'viewport': _VIEWPORTS.get(device, _VIEWPORTS['mobile']),
+        'user_agent': random.choice(_USER_AGENTS),
+        'color_scheme': "light",
+        'locale': 'en-US',
+        'timezone_id': 'America/New_York',
+        'extra_http_headers': {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'DNT': '1',
+        },
+    }
+
+
+def _capture_page(url, device, try_cleaned_url, light=False):
+    """Load url in a new browser context (Playwright worker only)
+    
+    Returns the page HTML, None, _USE_SCREENSHOT_API, or _RETRY_CLEANED_URL after a 403 on the
+    original URL (the caller does the backoff so the worker is not held up).
+    """
     # Clean URL if requested
     if try_cleaned_url:
         cleaned = clean_url_for_capture(url)
         if cleaned and not cleaned.startswith(('http://', 'https://')):
             url = f"https://{cleaned}"
     
-    # Random user agent
-    user_agents = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    ]
-    user_agent = random.choice(user_agents)
-    
-    viewports = {
-        'mobile': {'width': 390, 'height': 844},
-        'tablet': {'width': 1024, 'height': 768},
-        'laptop': {'width': 1920, 'height': 1080}
-    }
-    viewport = viewports.get(device, viewports['mobile'])
-    
-    timeout = 30000  # 30 seconds
+    timeout = _NAV_TIMEOUT_MS
     
     try:
-        with sync_playwright() as p:
-            # Use Chromium only (Firefox doesn't help)
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox',
-                ]
-            )
-            
-            # Create context with realistic settings
-            context = browser.new_context(
-                viewport=viewport,
-                user_agent=user_agent,
-                color_scheme="light",
-                locale='en-US',
-                timezone_id='America/New_York',
-                extra_http_headers={
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'DNT': '1',
-                }
-            )
-            
+        browser = _get_browser()
+        
+        # Create context with realistic settings
+        context = browser.new_context(**_context_options(device))
+        
+        try:
             page = context.new_page()
+            if light:
+                page.route("**/*", _route_light)
             
             # Essential stealth JS (only what works)
-            page.add_init_script("""
-                // Hide webdriver property
-                Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-                
-                // Add chrome object
-                if (!window.chrome) {
-                    window.chrome = { runtime: {}, loadTimes: function() {}, csi: function() {} };
-                }
-                
-                // Mock permissions
-                const originalQuery = window.navigator.permissions.query;
-                window.navigator.permissions.query = (params) => (
-                    params.name === 'notifications' ?
-                        Promise.resolve({ state: Notification.permission }) :
-                        originalQuery(params)
-                );
-            """)
+            page.add_init_script(_STEALTH_INIT_SCRIPT)
             
             page.set_default_navigation_timeout(timeout)
             page.on("dialog", lambda dialog: dialog.dismiss())
@@ -215,42 +525,41 @@ def capture_with_playwright(url, device='mobile', retry_count=1, use_firefox=Fal
             
             # Handle no response
             if not response:
-                browser.close()
                 # Check if 403 in error
                 if error and ('403' in str(error).lower() or 'forbidden' in str(error).lower()):
                     if not try_cleaned_url:
-                        import time
-                        time.sleep(random.uniform(1, 2))
-                        return capture_with_playwright(url, device, retry_count, False, try_cleaned_url=True)
-                    return _handle_403_fallback(url, device)
+                        return _RETRY_CLEANED_URL
+                    _mark_blocked_host(url)
+                    return _USE_SCREENSHOT_API
                 return None
             
             # Handle error status codes
             if response.status >= 400:
-                browser.close()
                 if response.status == 403:
                     # Try cleaned URL once, then fallback to Screenshot API
                     if not try_cleaned_url:
-                        import time
-                        time.sleep(random.uniform(1, 2))
-                        return capture_with_playwright(url, device, retry_count, False, try_cleaned_url=True)
-                    return _handle_403_fallback(url, device)
+                        return _RETRY_CLEANED_URL
+                    _mark_blocked_host(url)
+                    return _USE_SCREENSHOT_API
                 # Other errors - use Screenshot API
-                return _handle_403_fallback(url, device)
+                return _USE_SCREENSHOT_API
             
-            # Success - get content
+            # Success - give the load event a moment, then take the DOM as it is
+            # (networkidle rarely settles on ad/analytics-heavy pages)
             try:
-                page.wait_for_load_state("networkidle", timeout=3000)
+                page.wait_for_load_state("load", timeout=3000)
             except:
                 pass
             
             html_content = page.content()
-            browser.close()
-            
-            if html_content and len(html_content) > 100:
-                return html_content
-            
-            return None
+        finally:
+            # Closing the context releases the page; the browser stays up for the next capture
+            context.close()
+        
+        if html_content and len(html_content) > 100:
+            return html_content
+        
+        return None
             
     except Exception as e:
         error_str = str(e).lower()
@@ -258,9 +567,70 @@ def capture_with_playwright(url, device='mobile', retry_count=1, use_firefox=Fal
         # Handle 403 in exception
         if '403' in error_str or 'forbidden' in error_str:
             if not try_cleaned_url:
-                import time
-                time.sleep(random.uniform(1, 2))
-                return capture_with_playwright(url, device, retry_count, False, try_cleaned_url=True)
-            return _handle_403_fallback(url, device)
+                return _RETRY_CLEANED_URL
+            _mark_blocked_host(url)
+            return _USE_SCREENSHOT_API
         
         return None
+
+
+def capture_many_with_playwright(urls, device='mobile', concurrency=8, light=False):
+    """
+    Capture several pages concurrently (async Playwright, one browser for the batch)
+    
+    Returns a list of HTML strings aligned with urls; None where a capture failed or was
+    blocked - callers fall back to get_screenshot_url for those, as with capture_with_playwright.
+    light has the same meaning as in capture_with_playwright.
+    """
+    # Accepts any iterable (list, pandas Series); its truth value is only checked as a list
+    urls = list(urls) if urls is not None else []
+    if not PLAYWRIGHT_AVAILABLE or not urls:
+        return [None] * len(urls)
+    
+    try:
+        # Own thread and event loop: keeps clear of the sync Playwright workers and of any loop
+        # already running in the calling thread
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, _capture_many(urls, device, concurrency, light)).result()
+    except Exception:
+        return [None] * len(urls)
+
+
+async def _capture_many(urls, device, concurrency, light):
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=_CHROMIUM_ARGS)
+        try:
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*[_capture_one(browser, semaphore, url, device, light) for url in urls])
+        finally:
+            await browser.close()
+
+
+async def _capture_one(browser, semaphore, url, device, light):
+    """Async counterpart of _capture_page without the retry/fallback handling"""
+    if not url:
+        return None
+    async with semaphore:
+        context = await browser.new_context(**_context_options(device))
+        try:
+            page = await context.new_page()
+            if light:
+                await page.route("**/*", _route_light_async)
+            await page.add_init_script(_STEALTH_INIT_SCRIPT)
+            page.on("dialog", lambda dialog: asyncio.ensure_future(dialog.dismiss()))
+            
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=_NAV_TIMEOUT_MS)
+            if not response or response.status >= 400:
+                return None
+            
+            try:
+                await page.wait_for_load_state("load", timeout=3000)
+            except Exception:
+                pass
+            
+            html_content = await page.content()
+            return html_content if html_content and len(html_content) > 100 else None
+        except Exception:
+            return None
+        finally:
+            await context.close()
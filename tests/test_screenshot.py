@@ -0,0 +1,23 @@
+import pandas as pd
+
+from src import screenshot
+
+
+def test_capture_many_accepts_series_and_empty_input(monkeypatch):
+    monkeypatch.setattr(screenshot, 'PLAYWRIGHT_AVAILABLE', False)
+    urls = pd.Series(['https://a.example', 'https://b.example'])
+    assert screenshot.capture_many_with_playwright(urls) == [None, None]
+    assert screenshot.capture_many_with_playwright(pd.Series([], dtype=object)) == []
+    assert screenshot.capture_many_with_playwright(None) == []
+
+
+def test_capture_many_results_align_with_input(monkeypatch):
+    async def fake_capture_many(urls, device, concurrency, light):
+        return [f'<html>{url}</html>' if url else None for url in urls]
+
+    monkeypatch.setattr(screenshot, 'PLAYWRIGHT_AVAILABLE', True)
+    monkeypatch.setattr(screenshot, '_capture_many', fake_capture_many)
+    urls = pd.Series(['https://a.example', '', 'https://c.example'], index=[10, 20, 30])
+    assert screenshot.capture_many_with_playwright(urls) == [
+        '<html>https://a.example</html>', None, '<html>https://c.example</html>',
+    ]